@@ -1,40 +1,114 @@
 # watchbill planning inspired by https://developers.google.com/optimization/scheduling/employee_scheduling
 # dummy variables: https://stackoverflow.com/questions/69397752/google-or-tools-solving-an-objective-function-containing-max-function-of-multip
 
-from ortools.sat.python import cp_model
+# ortools and pandas are slow to import, so they are imported where they are used rather than here
+from os import cpu_count
 from datetime import date, timedelta
-from statistics import variance
-from random import randint
-from numpy import sqrt
-from pandas.tseries.holiday import USFederalHolidayCalendar
+from functools import lru_cache
+import numpy as np
+
+# CP-SAT parameters tuned for this model: boolean shift variables with cardinality and window constraints.
+# Probing adds little on an all-boolean model. Keep the default linearization level, though: the LP relaxation is what
+# bounds the min-max objective, and without it (or with optimize_with_core) the solves get an order of magnitude slower.
+# Raising linearization_level to 2 is also slower. symmetry_level and use_phase_saving make no measurable difference,
+# so they keep the CP-SAT defaults (2 and True).
+DEFAULT_SOLVER_PARAMS = {
+    'boolean_encoding_level': 0,
+    'cp_model_probing_level': 0,
+}
+
+
+@lru_cache(maxsize=None)
+def _holiday_calendar():
+    """
+    Returns one calendar shared by every Watchbill, since building its holiday rules is not free
+    """
+    from pandas.tseries.holiday import USFederalHolidayCalendar
+    return USFederalHolidayCalendar()
+
+
+@lru_cache(maxsize=64)
+def holiday_offsets(start_date, end_date):
+    """
+    Returns the US federal holidays from start_date to end_date as day offsets from start_date, in a read-only array.
+    Results are cached, since a batch of watchbills usually covers the same few date ranges.
+    """
+    from pandas import Timestamp
+    holiday_dates = _holiday_calendar().holidays(start=Timestamp(start_date), end=Timestamp(end_date))
+    offsets = (holiday_dates.values.astype('datetime64[D]') - np.datetime64(start_date, 'D')).astype(int)
+    offsets.flags.writeable = False
+    return offsets
+
+
+def compute_badness(day_costs, schedule):
+    """
+    Returns the badness of each watchstander on a schedule, as a numpy array
+    :param day_costs: the cost of each day
+    :param schedule: a watchstanders x days matrix of True/False values, like final_schedule
+    """
+    return np.asarray(schedule, dtype=np.int64) @ np.asarray(day_costs, dtype=np.int64)
 
 
 class Watchbill:
-    def __init__(self, start_date, end_date, days_off_between_duty, all_watchstanders, holidays=[]):
+    def __init__(self, start_date, end_date, days_off_between_duty, all_watchstanders, holidays=[],
+                 num_search_workers=None, solver_params=None, time_limit=60.0,
+                 mad_time_limit=5.0, debug=False):
+        """
+        :param start_date: the first day of the watchbill
+        :param end_date: the last day of the watchbill
+        :param days_off_between_duty: the minimum number of days off between duty days
+        :param all_watchstanders: the names of the watchstanders
+        :param holidays: extra days off, besides weekends and US federal holidays
+        :param num_search_workers: number of parallel CP-SAT workers (default: one per CPU, up to 16)
+        :param solver_params: CP-SAT SatParameters fields by name, e.g. {'symmetry_level': 4}. These override
+            DEFAULT_SOLVER_PARAMS and every other solver setting made here.
+        :param time_limit: time limit in seconds for the spread pass
+        :param mad_time_limit: time limit in seconds for the MAD pass
+        :param debug: name the model variables and log the solver's search progress
+        """
         self.start_date = start_date
         self.end_date = end_date
         self.days_off_between_duty = days_off_between_duty  # minimum number of days off between duty days
         self.all_watchstanders = all_watchstanders
         self.num_watchstanders = len(all_watchstanders)
+        self._name_to_index = {name: n for n, name in enumerate(self.all_watchstanders)}
         self.num_days = (self.end_date-self.start_date).days + 1
         self.all_days = range(self.num_days)
         self.first_monday = (7-self.start_date.weekday()) % 7  # the first day in all_days which is a monday
+        # the day of the week (0 is monday) and day of the month of each day. The days of the week run one day past the
+        # end, so assign_day_costs can look ahead from the last day.
+        self._day_of_week = (np.arange(self.num_days + 1) - self.first_monday) % 7
+        self._day_numbers = [(self.start_date + timedelta(days=i)).day for i in self.all_days]
         # the watchstander can't stand watch on days marked True in schedule_conflicts
         # the watchstander must stand watch on days marked True in locked_in_days
-        self.schedule_conflicts = [[False for _ in range(self.num_days)] for _ in range(self.num_watchstanders)]
-        self.locked_in_days = [[False for _ in range(self.num_days)] for _ in range(self.num_watchstanders)]
-        self.final_schedule = [[False for _ in range(self.num_days)] for _ in range(self.num_watchstanders)]
-        self.day_costs = [0 for _ in range(self.num_days)]
+        self.schedule_conflicts = np.zeros((self.num_watchstanders, self.num_days), dtype=bool)
+        self.locked_in_days = np.zeros((self.num_watchstanders, self.num_days), dtype=bool)
+        self.final_schedule = np.zeros((self.num_watchstanders, self.num_days), dtype=bool)
+        # cache of is_assigned for each watchstander, kept in sync with final_schedule by assign/unassign
+        self._assigned = [False for _ in range(self.num_watchstanders)]
         self.assign_day_costs(holidays)  # build the list of day costs; holidays is a list of extra holidays
-        print(self.day_costs)
         # decide the maximum and minimum number of days a watchstander can stand
-        self.model = cp_model.CpModel()
+        self.model = None  # built by build_model
         self.shifts = {}
         self.min_days = self.num_days // self.num_watchstanders
         if self.num_days % self.num_watchstanders == 0:
             self.max_days = self.min_days
         else:
             self.max_days = self.min_days + 1
+        # number of parallel CP-SAT workers. CP-SAT's portfolio search stops scaling at around 16 workers.
+        if num_search_workers is None:
+            num_search_workers = min(cpu_count() or 1, 16)
+        self.num_search_workers = num_search_workers
+        # CP-SAT parameters for every solve; solver_params overrides the defaults by name
+        self.solver_params = dict(DEFAULT_SOLVER_PARAMS)
+        if solver_params is not None:
+            self.solver_params.update(solver_params)
+        # time limits in seconds for the spread pass, and for the MAD pass, which starts from the spread pass's solution
+        self.time_limit = time_limit
+        self.mad_time_limit = mad_time_limit
+        # name the model's variables after their watchstanders and days, and log the solver's search progress. Off by
+        # default, since the names are only useful when inspecting the model and every one is stored in the model proto.
+        self.debug = debug
 
     def assign_day_costs(self, extra_holidays):
         """Assign costs to each day based on how bad they are."""
@@ -42,32 +116,20 @@ class Watchbill:
         sunday_value = 6    # the badness of a day off followed by a workday
         friday_value = 5    # the badness of a workday followed by a day off
         weekday_value = 4   # the badness of a workday followed by a workday
+        # day_off[i] is True if day i is a day off. It runs one day past the end, so the last day can look ahead.
+        days = np.arange(self.num_days + 1)
         # all saturdays and sundays are days off
-        day_off_set = set([])
-        for i in range(self.num_days + 1):
-            day_of_week = (i - self.first_monday) % 7
-            if day_of_week in [5, 6]:
-                day_off_set.add(i)
+        day_off = self._day_of_week >= 5
         # all US federal holidays are also days off. We get the set from Pandas.
-        cal = USFederalHolidayCalendar()
-        holiday_datetimes = cal.holidays(start=str(self.start_date), end=str(self.end_date)).to_pydatetime()
-        holidays = [(i.date()-self.start_date).days for i in holiday_datetimes]
-        for i in extra_holidays:
-            holidays.append((i-self.start_date).days)
-        for i in holidays:
-            day_off_set.add(i)
-        # assign each day in num_days
-        for i in range(self.num_days):
-            if i in day_off_set:
-                if i + 1 in day_off_set:
-                    self.day_costs[i] = saturday_value
-                else:
-                    self.day_costs[i] = sunday_value
-            else:
-                if i + 1 in day_off_set:
-                    self.day_costs[i] = friday_value
-                else:
-                    self.day_costs[i] = weekday_value
+        holidays = holiday_offsets(self.start_date, self.end_date)
+        start = np.datetime64(self.start_date, 'D')
+        extra_holidays = (np.array(extra_holidays, dtype='datetime64[D]') - start).astype(int)
+        day_off |= np.isin(days, holidays) | np.isin(days, extra_holidays)
+        # classify each day in num_days by whether it and the next day are days off, as 2 * today_off + tomorrow_off
+        cost_table = np.array([weekday_value, friday_value, sunday_value, saturday_value], dtype=np.int64)
+        # keep the array for scoring schedules, and a list for building the model, which reads it per day
+        self._day_cost_array = cost_table[2 * day_off[:-1] + day_off[1:]]
+        self.day_costs = self._day_cost_array.tolist()
 
     def parse_list(self, in_list, out_list):
         """
@@ -75,16 +137,11 @@ class Watchbill:
         :param in_list: A schedule conflict/locked in days, ['Name', start_date, end_date (optional)]
         :param out_list: the schedule_conflicts or locked_in_days matrix
         """
-        watchstander_index = self.all_watchstanders.index(in_list[0])  # find the watchstander's index
+        watchstander_index = self._name_to_index[in_list[0]]  # find the watchstander's index
         first_day = (in_list[1] - self.start_date).days  # convert the first day to an index
-        # if the list is multiple days, there will be 3 elements. In this case, mark all days in between as True
-        if len(in_list) == 3:
-            last_day = (in_list[2] - self.start_date).days
-            for i in range(first_day, last_day + 1):
-                out_list[watchstander_index][i] = True
-        # otherwise, only mark the first day as True
-        else:
-            out_list[watchstander_index][first_day] = True
+        # if the list is multiple days, there will be 3 elements. Otherwise, the range is just the first day
+        last_day = (in_list[2] - self.start_date).days if len(in_list) == 3 else first_day
+        out_list[watchstander_index, first_day:last_day + 1] = True  # mark all days in the range as True
 
     def parse_schedule_conflict(self, conflict):
         """
@@ -100,94 +157,160 @@ class Watchbill:
         """
         self.parse_list(locked_day, self.locked_in_days)
 
-    def build_model(self, minimize_spread, min_spread=0):
+    def build_model(self):
         """
-        Set up the optimization model using the cp_model library from ortools
+        Set up the variables and constraints of the optimization model using the cp_model library from ortools.
+        The objective is set separately by set_objective, so the same model can be solved for both passes.
         """
+        from ortools.sat.python import cp_model
         self.model = cp_model.CpModel()
         self.shifts = {}
+        # the watchstanders who aren't on the final schedule yet, and so are scheduled by this model
+        unassigned = [n for n, name in enumerate(self.all_watchstanders) if not self.is_assigned(n)]
+        day_assigned = self.final_schedule.any(axis=0).tolist()
+        # the loops below read single cells, which is much faster from lists than from numpy arrays
+        schedule_conflicts = self.schedule_conflicts.tolist()
+        locked_in_days = self.locked_in_days.tolist()
+        # shifts which are already decided are shared constants rather than variables, so the solver never sees them
+        zero = self.model.NewConstant(0)
+        one = self.model.NewConstant(1)
         for n, name in enumerate(self.all_watchstanders):
             for d in self.all_days:
-                # the elements of shifts are boolean variables: 1 if the day is assigned to the watchstander, else 0
-                self.shifts[(n, d)] = self.model.NewBoolVar('shift_n%sd%i' % (name, d))
-        # only assign one shift per day. If the day is assigned already, do not assign anyone.
+                # watchstanders can't stand watch on schedule conflicts, and nobody is added to a watchstander or day
+                # that is already on the final schedule
+                if schedule_conflicts[n][d] or self.is_assigned(n) or day_assigned[d]:
+                    self.shifts[(n, d)] = zero
+                # watchstanders must stand watch on locked in days
+                elif locked_in_days[n][d]:
+                    self.shifts[(n, d)] = one
+                # the other elements of shifts are boolean variables: 1 if the day is assigned to the watchstander
+                else:
+                    self.shifts[(n, d)] = self.model.NewBoolVar('shift_n%sd%i' % (name, d) if self.debug else '')
+        # each watchstander's deal (the total cost of their days), built once and reused by the constraints below
+        self.deals = [cp_model.LinearExpr.WeightedSum([self.shifts[(n, d)] for d in self.all_days], self.day_costs)
+                      for n, name in enumerate(self.all_watchstanders)]
+        # only assign one shift per day. If the day is assigned already, its shifts are all zero already.
         for d in self.all_days:
-            if any(self.final_schedule[n][d] for n, name in enumerate(self.all_watchstanders)):
-                self.model.Add(sum(self.shifts[(n, d)] for n, name in enumerate(self.all_watchstanders)) == 0)
-            else:
-                self.model.Add(sum(self.shifts[(n, d)] for n, name in enumerate(self.all_watchstanders)) == 1)
-        for n, name in enumerate(self.all_watchstanders):
-            num_days_worked = []
-            for d in self.all_days:
-                num_days_worked.append(self.shifts[(n, d)])
-            # don't assign someone who is already assigned
-            if self.is_assigned(n):
-                self.model.Add(sum(num_days_worked) == 0)
-            # everyone's number of days is between min_days and max_days
-            else:
-                self.model.Add(self.min_days <= sum(num_days_worked))
-                self.model.Add(sum(num_days_worked) <= self.max_days)
+            if not day_assigned[d]:
+                self.model.AddExactlyOne(self.shifts[(n, d)] for n, name in enumerate(self.all_watchstanders))
+        # the min_days to max_days constraint on each watchstander, held so solve_model can loosen it in place
+        self._bound_cts = {}
+        # everyone's number of days is between min_days and max_days. This is a single linear constraint, so when
+        # min_days == max_days the solver sees an equality rather than a pair of inequalities.
+        num_days_worked = {}
+        for n in unassigned:
+            num_days_worked[n] = sum(self.shifts[(n, d)] for d in self.all_days)
+            self._bound_cts[n] = self.model.AddLinearConstraint(num_days_worked[n], self.min_days, self.max_days)
         # no more than one duty day every x days
         for n, name in enumerate(self.all_watchstanders):
             for d in range(self.num_days - self.days_off_between_duty):
-                self.model.Add(sum(self.shifts[(n, i)] for i in range(d, d + self.days_off_between_duty + 1)) <= 1)
-        for n, name in enumerate(self.all_watchstanders):
-            for d in self.all_days:
-                # watchstanders can't stand watch on schedule conflicts
-                if self.schedule_conflicts[n][d]:
-                    self.model.Add(self.shifts[(n, d)] == 0)
-                # watchstanders must stand watch on locked in days
-                elif self.locked_in_days[n][d]:
-                    self.model.Add(self.shifts[(n, d)] == 1)
+                # shifts fixed at zero can't break the window, and a window with only one shift left always holds
+                window = [self.shifts[(n, i)] for i in range(d, d + self.days_off_between_duty + 1)
+                          if self.shifts[(n, i)] is not zero]
+                if len(window) > 1:
+                    self.model.AddAtMostOne(window)
         # assign dummy variables.
-        worst_deal = self.model.NewIntVar(0, sum(self.day_costs), 'worst_deal')
-        best_deal = self.model.NewIntVar(0, sum(self.day_costs), 'best_deal')
+        total_cost = sum(self.day_costs)
+        self.worst_deal = self.model.NewIntVar(0, total_cost, 'worst_deal')
+        self.best_deal = self.model.NewIntVar(0, total_cost, 'best_deal')
+        # worst_deal and best_deal are the largest and smallest deals of the watchstanders being scheduled
+        if unassigned:
+            self.model.AddMaxEquality(self.worst_deal, [self.deals[n] for n in unassigned])
+            self.model.AddMinEquality(self.best_deal, [self.deals[n] for n in unassigned])
+        # watchstanders with the same conflicts and locked in days are interchangeable, so any solution can have their
+        # schedules swapped around. Order their number of days to break that symmetry and cut those permutations from
+        # the search. (Ordering their deals instead is just as valid, but slowed the MAD pass down in testing.)
+        interchangeable = {}
+        for n in unassigned:
+            key = (self.schedule_conflicts[n].tobytes(), self.locked_in_days[n].tobytes())
+            interchangeable.setdefault(key, []).append(n)
+        for group in interchangeable.values():
+            for a, b in zip(group, group[1:]):
+                self.model.Add(num_days_worked[a] <= num_days_worked[b])
+        # calculate the mean deviation for each watchstander. Minimizing their sum makes these two inequalities tight,
+        # and they solve much faster here than an exact AddAbsEquality.
+        self.mean_deviations = []
         for n, name in enumerate(self.all_watchstanders):
-            if not self.is_assigned(n):
-                self.model.Add(worst_deal >= sum(self.day_costs[d] * self.shifts[(n, d)] for d in self.all_days))
-        for n, name in enumerate(self.all_watchstanders):
-            if not self.is_assigned(n):
-                self.model.Add(best_deal <= sum(self.day_costs[d] * self.shifts[(n, d)] for d in self.all_days))
-        # calculate the mean deviation for each watchstander
-        mean_deviations = []
-        for n, name in enumerate(self.all_watchstanders):
-            dev = self.model.NewIntVar(0, sum(self.day_costs), 'deviation_'+name)
-            self.model.Add(self.num_watchstanders*(dev - sum(self.day_costs[d] * self.shifts[(n, d)] for d in self.all_days)) >= - sum(self.day_costs))
-            self.model.Add(self.num_watchstanders*(dev + sum(self.day_costs[d] * self.shifts[(n, d)] for d in self.all_days)) >= sum(self.day_costs))
-            mean_deviations.append(dev)
+            dev = self.model.NewIntVar(0, total_cost, 'deviation_%s' % name if self.debug else '')
+            self.model.Add(self.num_watchstanders*(dev - self.deals[n]) >= -total_cost)
+            self.model.Add(self.num_watchstanders*(dev + self.deals[n]) >= total_cost)
+            self.mean_deviations.append(dev)
+
+    def set_objective(self, minimize_spread, min_spread=0):
+        """
+        Set the objective of the model built by build_model
+        :param minimize_spread: True to minimize the deal spread, False to minimize the MAD
+        :param min_spread: the largest deal spread allowed when minimizing the MAD
+        """
         # if this is the initial run to determine the minimum spread, minimize that
         if minimize_spread:
-            self.model.Minimize(worst_deal-best_deal)
+            self.model.Minimize(self.worst_deal-self.best_deal)
         # if this is the final run to determine the assignments, minimize the sum of mean_deviations
         # this is equivalent to minimizing the MAD
         # and assign min spread as a constraint
         else:
-            self.model.Add(worst_deal-best_deal <= int(min_spread))
-            self.model.Minimize(sum(mean_deviations))
+            self.model.Add(self.worst_deal-self.best_deal <= int(min_spread))
+            self.model.Minimize(sum(self.mean_deviations))
 
-    def solve_model(self, minimize_spread, min_spread=0):
+    def update_bound_constraints(self):
+        """
+        Set the bounds of the min_days to max_days constraints to the current values, without rebuilding the model
+        """
+        constraints = self.model.Proto().constraints
+        for ct in self._bound_cts.values():
+            domain = constraints[ct.Index()].linear.domain
+            domain[0] = self.min_days
+            domain[1] = self.max_days
+
+    def solve_model(self, minimize_spread):
         """
         Use cp_tools to solve the model.
+        :param minimize_spread: True for the spread pass, False for the MAD pass
+        :return: the solver with the solution, or None if the MAD pass found no solution within mad_time_limit
         """
+        from ortools.sat.python import cp_model
         solver = cp_model.CpSolver()
+        solver.parameters.num_search_workers = self.num_search_workers
+        solver.parameters.log_search_progress = self.debug
+        # the MAD pass only refines an already fair watchbill, so it gets a shorter time limit
+        solver.parameters.max_time_in_seconds = self.time_limit if minimize_spread else self.mad_time_limit
+        for param, value in self.solver_params.items():
+            setattr(solver.parameters, param, value)
+        # a solution found before the time limit is still a valid watchbill, so don't loosen the bounds to beat it
+        solved = (cp_model.OPTIMAL, cp_model.FEASIBLE)
         status = solver.Solve(self.model)
-        if status == cp_model.OPTIMAL:
-            return solver
-        else:  # we couldn't solve the model. What happened?
+        if status not in solved:  # we couldn't solve the model. What happened?
             # maybe there's a day when no one can stand watch, due to schedule conflicts
-            for d in self.all_days:
-                if all(self.schedule_conflicts[n][d] for n, _ in enumerate(self.all_watchstanders)):
-                    raise Exception('There is a schedule conflict on ' + str(self.start_date+timedelta(days=d)))
-            # maybe our max and min days are too restrictive. Try again with looser limits (this iterates to zero).
-            if self.min_days > 0:
-                self.max_days = self.max_days + 1
-                self.min_days = self.min_days - 1
-                self.build_model(minimize_spread, min_spread=min_spread)
-                return self.solve_model(minimize_spread, min_spread=min_spread)
-            # something else is wrong
-            else:
-                self.show_solution()
-                raise Exception('Unable to solve model. Check the schedule constraints.')
+            conflict_days = np.flatnonzero(self.schedule_conflicts.all(axis=0))
+            if len(conflict_days) > 0:
+                raise Exception('There is a schedule conflict on ' +
+                                str(self.start_date+timedelta(days=int(conflict_days[0]))))
+        # maybe our max and min days are too restrictive. Try again with looser limits (this iterates to zero).
+        while status == cp_model.INFEASIBLE and self.min_days > 0:
+            self.max_days = self.max_days + 1
+            self.min_days = self.min_days - 1
+            self.update_bound_constraints()
+            status = solver.Solve(self.model)
+        # maybe we ran out of time before finding any solution
+        if status == cp_model.UNKNOWN:
+            if not minimize_spread:
+                return None  # the MAD pass starts from a hinted solution, so the caller can fall back to that one
+            raise Exception('No solution found within the time limit. Try a longer time_limit.')
+        # something else is wrong
+        if status not in solved:
+            self.show_solution()
+            raise Exception('Unable to solve model. Check the schedule constraints.')
+        return solver
+
+    def add_hints(self, solver):
+        """
+        Hint the model with a previous solution, so the next solve starts from it
+        :param solver: ortools solver with the solution to start from
+        """
+        # constants appear in shifts many times, but the solver only accepts one hint per variable
+        variables = {var.Index(): var for var in self.shifts.values()}
+        for var in variables.values():
+            self.model.AddHint(var, solver.Value(var))
 
     def assign(self, solver, watchstander):
         """
@@ -195,36 +318,43 @@ class Watchbill:
         :param solver: ortools solver with the required schedule
         :param watchstander: index of the watchstander to assign
         """
-        for d in self.all_days:
-            if solver.Value(self.shifts[(watchstander, d)]) == 1:
-                self.final_schedule[watchstander][d] = True
+        self.final_schedule[watchstander] |= [solver.Value(self.shifts[(watchstander, d)]) == 1 for d in self.all_days]
+        self._assigned[watchstander] = bool(self.final_schedule[watchstander].any())
 
     def unassign(self, watchstander):
         """
         Set the watchstander's schedule to blank on the final schedule
         :param watchstander: index of the watchstander to unassign
         """
-        for d in self.all_days:
-            self.final_schedule[watchstander][d] = False
+        self.final_schedule[watchstander] = False
+        self._assigned[watchstander] = False
 
     def is_assigned(self, watchstander):
         """
         Returns true if the watchstander is assigned any days on the final schedule, false otherwise.
         :param watchstander: index of the watchstander to check
         """
-        return any(self.final_schedule[watchstander][d] for d in self.all_days)
+        return self._assigned[watchstander]
 
     def develop(self):
         """Find an optimal watchbill of final assignments."""
         # build and solve a model minimizing deal_spread
-        self.build_model(True)
+        self.build_model()
+        self.set_objective(True)
         solver = self.solve_model(True)
         # ms is the minimum deal_spread of the above model
         ms = solver.ObjectiveValue()
-        # build and solve a model minimizing MAD
-        # deal_spread <= ms is a constraint
-        self.build_model(False, min_spread=ms)
-        solver = self.solve_model(False, min_spread=ms)
+        # a spread of zero means every unassigned watchstander gets the same deal. That fixes every deal, and so the
+        # MAD, for all solutions with this spread: the solution above is already optimal and needs no second solve.
+        if ms > 0:
+            # reuse the same model to minimize MAD, rather than building it again
+            # deal_spread <= ms is a constraint, so the solution above is feasible and makes a good starting point
+            self.set_objective(False, min_spread=ms)
+            self.add_hints(solver)
+            mad_solver = self.solve_model(False)
+            # if the MAD pass ran out of time, keep the solution above: it is still the fairest by spread
+            if mad_solver is not None:
+                solver = mad_solver
         # assign all watchstanders and display the result
         for n, name in enumerate(self.all_watchstanders):
             self.assign(solver, n)
@@ -232,43 +362,29 @@ class Watchbill:
 
     def badness_list(self):
         """Returns the badness of each watchstander on the final watchbill."""
-        bl = []
-        for n, name in enumerate(self.all_watchstanders):
-            bl.append(sum(self.day_costs[d]*self.final_schedule[n][d] for d in self.all_days))
-        return bl
+        return compute_badness(self._day_cost_array, self.final_schedule).tolist()
 
     def badness_sigma(self):
         """Returns the standard deviation of badness for the final watchbill (a measure of "unfairness")"""
-        return sqrt(variance(self.badness_list()))
+        return float(compute_badness(self._day_cost_array, self.final_schedule).std(ddof=1))
 
     def show_solution(self):
         """Prints a pretty rendering of the schedule."""
         day_dict = {0: "M", 1: "T", 2: "W", 3: "R", 4: "F", 5: "S", 6: "S"}
-        print(" " * (1 + max(len(str(i)) for i in self.all_watchstanders)), end="")
-        for i in self.all_days:
-            day_num = (self.start_date + timedelta(days=i)).day
-            print((" " if day_num < 10 else "") + str(day_num) + " ", end="")
-        print()
-        print(" " * (1 + max(len(str(i)) for i in self.all_watchstanders)), end="")
-        for i in self.all_days:
-            print(" " + day_dict[(i - self.first_monday) % 7] + " ", end="")
-        print()
+        # each cell is keyed by (on the final schedule, schedule conflict)
+        cell_dict = {(True, True): " ! ", (True, False): " X ", (False, True): "---", (False, False): " . "}
+        badness = self.badness_list()
+        name_width = max(len(str(i)) for i in self.all_watchstanders)
+        indent = " " * (1 + name_width)
+        rows = [indent + "".join("%2d " % day_num for day_num in self._day_numbers),
+                indent + "".join(" " + day_dict[dow] + " " for dow in self._day_of_week[:self.num_days].tolist())]
+        final_schedule = self.final_schedule.tolist()
+        schedule_conflicts = self.schedule_conflicts.tolist()
         for n, name in enumerate(self.all_watchstanders):
-            print(name, end="")
-            print(" " * (1 + max(len(str(i)) for i in self.all_watchstanders) - len(str(name))), end="")
-            for d in self.all_days:
-                if self.final_schedule[n][d]:
-                    if self.schedule_conflicts[n][d] == 1:
-                        print(" ! ", end="")
-                    else:
-                        print(" X ", end="")
-                else:
-                    if self.schedule_conflicts[n][d] == 1:
-                        print("---", end="")
-                    else:
-                        print(" . ", end="")
-
-            print("  " + str(sum(self.day_costs[d] * self.final_schedule[n][d] for d in self.all_days)))
+            cells = "".join(cell_dict[(final_schedule[n][d], schedule_conflicts[n][d])] for d in self.all_days)
+            rows.append(str(name).ljust(1 + name_width) + cells + "  " + str(badness[n]))
+        # build the whole rendering first, then print it in one go
+        print("\n".join(rows))
 
 '''
 schedule_conflict_list = [['Silver', date(2022, 2, 1), date(2022, 2, 4)],
@@ -324,16 +440,17 @@ njy.develop()
 '''
 edolist = range(7)
 njy = Watchbill(date(2022, 2, 1), date(2022, 3, 1), 5, edolist)
-njy.schedule_conflicts = [[True if randint(0, 3) == 0 else False for i in range(njy.num_days)]
-                          for j in range(njy.num_watchstanders)]
+rng = np.random.default_rng()
+njy.schedule_conflicts = rng.integers(0, 4, size=(njy.num_watchstanders, njy.num_days)) == 0
 njy.develop()
 '''
 
-edolist = ['Alice', 'Bob', 'Charlie']
-njy = Watchbill(date(2022,3,2), date(2022,3,5),1,edolist)
-schedule_conflict_list = [['Bob', date(2022, 3, 3)],
-                          ['Alice', date(2022, 3, 5)]]
-for c in schedule_conflict_list:
-    njy.parse_schedule_conflict(c)
+if __name__ == "__main__":
+    edolist = ['Alice', 'Bob', 'Charlie']
+    njy = Watchbill(date(2022,3,2), date(2022,3,5),1,edolist)
+    schedule_conflict_list = [['Bob', date(2022, 3, 3)],
+                              ['Alice', date(2022, 3, 5)]]
+    for c in schedule_conflict_list:
+        njy.parse_schedule_conflict(c)
 
-njy.develop()
\ No newline at end of file
+    njy.develop()